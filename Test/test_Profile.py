@@ -46,6 +46,16 @@ def test_find_time_odd_profile():
     assert time == 16676.0
 
 
+def test_profile_from_dict():
+    profile_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'Test', "test-fast.json"))
+    with open(profile_path) as infile:
+        profile_obj = json.load(infile)
+    profile = Profile(profile_obj)
+
+    assert profile.name == get_profile().name
+    assert profile.data == get_profile().data
+
+
 def test_find_x_given_y_on_line_from_two_points():
     profile = get_profile()
 
@@ -0,0 +1,121 @@
+import importlib
+import sys
+import threading
+import time
+import types
+
+import pytest
+
+
+class StubBot:
+    '''records messages; blocks in send_message() while the gate is closed'''
+    def __init__(self, token=None):
+        self.messages = []
+        self.fail = False
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def send_message(self, chat_id, text):
+        self.gate.wait()
+        if self.fail:
+            raise RuntimeError("telegram is unreachable")
+        self.messages.append(text)
+
+
+def wait_for(check, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not check():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+@pytest.fixture
+def telegram_observer(monkeypatch):
+    # the real config module needs the kiln hardware libraries
+    config = types.ModuleType("config")
+    config.enable_telegram_observer = True
+    config.telegram_bot_token = "token"
+    config.telegram_chat_id = "chat"
+    config.telegram_update_interval = 120
+    config.telegram_send_when_idle = False
+    telegram = types.ModuleType("telegram")
+    telegram.Bot = StubBot
+    monkeypatch.setitem(sys.modules, "config", config)
+    monkeypatch.setitem(sys.modules, "telegram", telegram)
+    monkeypatch.delitem(sys.modules, "lib.telegram_observer", raising=False)
+    return importlib.import_module("lib.telegram_observer")
+
+
+def running(**data):
+    return dict({"state": "RUNNING", "temperature": 500.0, "target": 510.0,
+                 "runtime": 60.4, "profile": "cone-05", "pidstats": {"err": 10.0}}, **data)
+
+
+def test_updates_are_throttled(telegram_observer):
+    observer = telegram_observer.TelegramObserver()
+
+    observer.send(running())
+    observer.send(running(temperature=501.0))
+    assert wait_for(lambda: observer.bot.messages)
+    time.sleep(0.05)
+
+    assert len(observer.bot.messages) == 1
+    assert "Temp: 500.0°C" in observer.bot.messages[0]
+
+
+def test_idle_updates_are_skipped(telegram_observer):
+    observer = telegram_observer.TelegramObserver()
+
+    observer.send(running(state="IDLE"))
+    observer.send({"type": "backlog"})
+
+    assert observer.last_sent is None
+    assert observer.queue.empty()
+
+
+def test_full_queue_drops_update(telegram_observer):
+    observer = telegram_observer.TelegramObserver()
+    observer.interval = 0
+    observer.bot.gate.clear()
+
+    observer.send(running(runtime=0))
+    assert wait_for(lambda: observer.queue.empty())
+    for n in range(1, observer.queue.maxsize + 2):
+        observer.send(running(runtime=n))
+    assert observer.queue.full()
+    observer.bot.gate.set()
+    assert wait_for(lambda: len(observer.bot.messages) == observer.queue.maxsize + 1)
+    time.sleep(0.05)
+
+    runtimes = [message.split("Runtime: ")[1].split("s")[0] for message in observer.bot.messages]
+    assert runtimes == [str(n) for n in range(observer.queue.maxsize + 1)]
+
+
+def test_failed_send_is_retried(telegram_observer):
+    observer = telegram_observer.TelegramObserver()
+    observer.bot.fail = True
+    observer.bot.gate.clear()
+
+    observer.send(running())
+    assert observer.last_sent is not None
+    observer.bot.gate.set()
+    assert wait_for(lambda: observer.last_sent is None)
+    observer.bot.fail = False
+    observer.send(running())
+
+    assert wait_for(lambda: observer.bot.messages)
+
+
+def test_message_fills_in_missing_fields(telegram_observer):
+    observer = telegram_observer.TelegramObserver()
+
+    message = observer.format_message({"state": "RUNNING"})
+
+    assert message == ("🔥 Kiln Status Update 🔥\n"
+                       "State: RUNNING\n"
+                       "Profile: N/A\n"
+                       "Temp: 0.0°C / Target: 0.0°C\n"
+                       "Runtime: 0s\n"
+                       "Error: +0.0°C")
@@ -0,0 +1,131 @@
+import threading
+import time
+
+import pytest
+from geventwebsocket import WebSocketError
+
+from lib.webSocket_observer import WebSocketObserver
+
+
+class FakeWebSocket:
+    '''records frames; blocks in send() while the gate is closed'''
+    def __init__(self, fail=False):
+        self.frames = []
+        self.fail = fail
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def send(self, frame):
+        self.gate.wait()
+        if self.fail:
+            raise WebSocketError("socket is dead")
+        self.frames.append(frame)
+
+
+def wait_for(check, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not check():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def blocked_observer(wsock):
+    '''returns an observer whose writer is stuck sending its first frame'''
+    wsock.gate.clear()
+    observer = WebSocketObserver(wsock)
+    observer.send_json('"first"')
+    assert wait_for(lambda: not observer.pending)
+    return observer
+
+
+def test_identical_payloads_are_dropped():
+    wsock = FakeWebSocket()
+    observer = WebSocketObserver(wsock)
+
+    observer.send_json('{"temperature":20}')
+    assert wait_for(lambda: len(wsock.frames) == 1)
+    observer.send_json('{"temperature":20}')
+    observer.send_json('{"temperature":21}')
+    assert wait_for(lambda: len(wsock.frames) == 2)
+
+    assert wsock.frames == ['{"temperature":20}', '{"temperature":21}']
+    observer.close()
+
+
+def test_send_encodes_dicts():
+    wsock = FakeWebSocket()
+    observer = WebSocketObserver(wsock)
+
+    observer.send({"state": "IDLE"})
+    assert wait_for(lambda: wsock.frames)
+
+    assert wsock.frames == ['{"state":"IDLE"}']
+    observer.close()
+
+
+def test_burst_is_sent_as_one_array_frame():
+    wsock = FakeWebSocket()
+    observer = blocked_observer(wsock)
+
+    observer.send_json('{"n":1}')
+    observer.send_json('{"n":2}')
+    observer.send_json('{"n":3}')
+    wsock.gate.set()
+    assert wait_for(lambda: len(wsock.frames) == 2)
+
+    assert wsock.frames == ['"first"', '[{"n":1},{"n":2},{"n":3}]']
+    observer.close()
+
+
+def test_full_queue_drops_oldest():
+    wsock = FakeWebSocket()
+    observer = blocked_observer(wsock)
+
+    total = WebSocketObserver.max_pending + 5
+    for n in range(total):
+        observer.send_json(str(n))
+    assert len(observer.pending) == WebSocketObserver.max_pending
+    wsock.gate.set()
+    assert wait_for(lambda: len(wsock.frames) == 2)
+
+    kept = range(total - WebSocketObserver.max_pending, total)
+    assert wsock.frames[1] == "[" + ",".join(str(n) for n in kept) + "]"
+    observer.close()
+
+
+def test_send_json_raises_after_close():
+    observer = WebSocketObserver(FakeWebSocket())
+    observer.close()
+
+    with pytest.raises(WebSocketError):
+        observer.send_json('{"n":1}')
+    observer.writer.join(timeout=2)
+    assert not observer.writer.is_alive()
+
+
+def test_send_json_raises_after_failed_send():
+    wsock = FakeWebSocket(fail=True)
+    observer = WebSocketObserver(wsock)
+
+    observer.send_json('{"n":1}')
+    assert wait_for(lambda: observer.failed)
+
+    with pytest.raises(WebSocketError):
+        observer.send_json('{"n":2}')
+
+
+def test_slow_client_is_dropped(monkeypatch):
+    monkeypatch.setattr(WebSocketObserver, "slow_client_timeout", 0.05)
+    wsock = FakeWebSocket()
+    observer = blocked_observer(wsock)
+
+    for n in range(WebSocketObserver.max_pending):
+        observer.send_json(str(n))
+    time.sleep(0.1)
+
+    with pytest.raises(WebSocketError):
+        observer.send_json('"late"')
+    observer.close()
+    wsock.gate.set()
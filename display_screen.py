@@ -1,7 +1,3 @@
-from luma.core.interface.serial import spi
-from luma.lcd.device import st7735
-from luma.core.render import canvas
-from PIL import ImageFont
 import logging, socket
 from lib.base_observer import BaseObserver
 
@@ -43,9 +39,25 @@ class KilnDisplay(BaseObserver):
         # Initialize BaseObserver manually
         BaseObserver.__init__(self, observer_type="display")
 
+        # text currently on screen, see update()
+        self.last_lines = None
+
         self.width = config.get('width', 160)
         self.height = config.get('height', 128)
 
+        # The display libraries are only needed with a screen attached, so
+        # import them here. Without them the kiln runs with no display.
+        try:
+            from luma.core.interface.serial import spi
+            from luma.lcd.device import st7735
+            from luma.core.render import canvas
+            from PIL import ImageFont
+        except ImportError as e:
+            logger.warning(f"[KilnDisplay] Display libraries not available: {e}")
+            self.device = None
+            return
+        self.canvas = canvas
+
         # Load fonts; fallback to default if error
         self.font_small = ImageFont.load_default()
         self.font_large = self.font_small
@@ -102,7 +114,7 @@ class KilnDisplay(BaseObserver):
         if not self.device:
             return
         if not isinstance(data, dict):
-            logger.debug(f"[KilnDisplay] Ignoring non-dict: {data}")
+            logger.debug("[KilnDisplay] Ignoring non-dict: %s", data)
             return
 
         # Collect the relevant fields
@@ -126,31 +138,35 @@ class KilnDisplay(BaseObserver):
         """
         if not self.device:
             return
+
         try:
-            with canvas(self.device) as draw:
+            lines = (
                 # 1) IP address
-                ip_str = f"IP: {self.get_local_ip()}"
-                draw.text((2, 0), ip_str, fill="white", font=self.font_small)
-
+                f"IP: {self.get_local_ip()}",
                 # 2) Current vs. Target
-                temp_str = f"Now: {current_temp:.1f}C / Set: {target_temp:.1f}C"
-                draw.text((2, 16), temp_str, fill="white", font=self.font_large)
-
+                f"Now: {current_temp:.1f}C / Set: {target_temp:.1f}C",
                 # 3) Kiln state
-                state_str = f"State: {kiln_state}"
-                draw.text((2, 40), state_str, fill="white", font=self.font_small)
-
+                f"State: {kiln_state}",
                 # 4) Error from target
-                err_str = f"Err: {kiln_err:+.1f}C"
-                draw.text((2, 56), err_str, fill="white", font=self.font_small)
-
+                f"Err: {kiln_err:+.1f}C",
                 # 5) Elapsed runtime
-                run_str = f"Runtime: {runtime:.0f}s"
-                draw.text((2, 72), run_str, fill="white", font=self.font_small)
-
+                f"Runtime: {runtime:.0f}s",
                 # 6) Current profile name
-                prof_str = f"Profile: {profile_name}"
-                draw.text((2, 88), prof_str, fill="white", font=self.font_small)
+                f"Profile: {profile_name}",
+            )
+            # pushing a frame over SPI is the slow part, so skip it when the
+            # screen would look exactly the same
+            if lines == self.last_lines:
+                return
+
+            with self.canvas(self.device) as draw:
+                draw.text((2, 0), lines[0], fill="white", font=self.font_small)
+                draw.text((2, 16), lines[1], fill="white", font=self.font_large)
+                draw.text((2, 40), lines[2], fill="white", font=self.font_small)
+                draw.text((2, 56), lines[3], fill="white", font=self.font_small)
+                draw.text((2, 72), lines[4], fill="white", font=self.font_small)
+                draw.text((2, 88), lines[5], fill="white", font=self.font_small)
+            self.last_lines = lines
 
         except Exception as e:
             logger.error(f"[KilnDisplay] Error drawing: {e}")
@@ -180,7 +196,8 @@ class KilnDisplay(BaseObserver):
         if not self.device:
             return
         try:
-            with canvas(self.device) as draw:
+            with self.canvas(self.device) as draw:
                 draw.rectangle((0, 0, self.width, self.height), outline="black", fill="black")
+            self.last_lines = None
         except Exception as e:
             logger.error(f"[KilnDisplay] Error clearing: {e}")
@@ -4,7 +4,8 @@ import time
 import os
 import sys
 import logging
-import json
+import functools
+import hashlib
 
 import bottle
 import gevent
@@ -14,6 +15,8 @@ from gevent.pywsgi import WSGIServer
 from geventwebsocket.handler import WebSocketHandler
 from geventwebsocket import WebSocketError
 
+from lib.json_codec import json_loads, json_dumps
+
 # try/except removed here on purpose so folks can see why things break
 import config
 
@@ -71,86 +74,132 @@ def index():
 def state():
     return bottle.redirect('/picoreflow/state.html')
 
+# the PID replaces pidstats with a new dict on every compute, so the
+# serialized stats only need rebuilding when that object changes
+_pidstats_cache = {"pidstats": None, "json": None, "etag": None}
+
+def get_pidstats_json():
+    pidstats = oven.pid.pidstats
+    if pidstats is not _pidstats_cache["pidstats"]:
+        _pidstats_cache["pidstats"] = pidstats
+        _pidstats_cache["json"] = json_dumps(pidstats)
+        _pidstats_cache["etag"] = make_etag(_pidstats_cache["json"])
+    return _pidstats_cache["json"]
+
+def make_etag(body):
+    return '"%s"' % hashlib.blake2b(body.encode(), digest_size=8).hexdigest()
+
+def etag_response(body, etag):
+    '''
+    return body as json with its ETag, or an empty 304 if the client
+    already has this exact body.
+    '''
+    if bottle.request.headers.get('If-None-Match') == etag:
+        return bottle.HTTPResponse(status=304, headers={'ETag': etag})
+    return bottle.HTTPResponse(body=body, headers={'ETag': etag,
+        'Content-Type': 'application/json'})
+
 @app.get('/api/stats')
 def handle_api():
     log.info("/api/stats command received")
     if hasattr(oven,'pid'):
         if hasattr(oven.pid,'pidstats'):
-            return json.dumps(oven.pid.pidstats)
-
+            body = get_pidstats_json()
+            return etag_response(body, _pidstats_cache["etag"])
+
+
+# the reply to every successful /api command, serialized once
+API_SUCCESS = json_dumps({ "success" : True })
+
+def api_run(command):
+    '''run a kiln schedule'''
+    wanted = command['profile']
+    log.info('api requested run of profile = %s' % wanted)
+
+    # start at a specific minute in the schedule
+    # for restarting and skipping over early parts of a schedule
+    startat = 0;      
+    if 'startat' in command:
+        startat = command['startat']
+
+    #Shut off seek if start time has been set
+    allow_seek = True
+    if startat > 0:
+        allow_seek = False
+
+    # get the wanted profile/kiln schedule
+    profile = find_profile(wanted)
+    if profile is None:
+        return { "success" : False, "error" : "profile %s not found" % wanted }
+
+    profile = Profile(profile)
+    oven.run_profile(profile, startat=startat, allow_seek=allow_seek)
+    ovenWatcher.record(profile)
+
+def api_pause(command):
+    log.info("api pause command received")
+    oven.state = 'PAUSED'
+
+def api_resume(command):
+    log.info("api resume command received")
+    oven.state = 'RUNNING'
+
+def api_stop(command):
+    log.info("api stop command received")
+    oven.abort_run()
+
+def api_memo(command):
+    log.info("api memo command received")
+    memo = command['memo']
+    log.info("memo=%s" % (memo))
+
+def api_stats(command):
+    '''get stats during a run'''
+    log.info("api stats command received")
+    if hasattr(oven,'pid'):
+        if hasattr(oven.pid,'pidstats'):
+            return get_pidstats_json()
+
+# /api commands. a handler returns a response, or None for API_SUCCESS.
+# unknown commands also get API_SUCCESS.
+API_COMMANDS = {
+    'run': api_run,
+    'pause': api_pause,
+    'resume': api_resume,
+    'stop': api_stop,
+    'memo': api_memo,
+    'stats': api_stats,
+}
 
 @app.post('/api')
 def handle_api():
     log.info("/api is alive")
+    command = bottle.request.json
+    action = API_COMMANDS.get(command['cmd'])
+    if action:
+        response = action(command)
+        if response is not None:
+            return response
 
-
-    # run a kiln schedule
-    if bottle.request.json['cmd'] == 'run':
-        wanted = bottle.request.json['profile']
-        log.info('api requested run of profile = %s' % wanted)
-
-        # start at a specific minute in the schedule
-        # for restarting and skipping over early parts of a schedule
-        startat = 0;      
-        if 'startat' in bottle.request.json:
-            startat = bottle.request.json['startat']
-
-        #Shut off seek if start time has been set
-        allow_seek = True
-        if startat > 0:
-            allow_seek = False
-
-        # get the wanted profile/kiln schedule
-        profile = find_profile(wanted)
-        if profile is None:
-            return { "success" : False, "error" : "profile %s not found" % wanted }
-
-        # FIXME juggling of json should happen in the Profile class
-        profile_json = json.dumps(profile)
-        profile = Profile(profile_json)
-        oven.run_profile(profile, startat=startat, allow_seek=allow_seek)
-        ovenWatcher.record(profile)
-
-    if bottle.request.json['cmd'] == 'pause':
-        log.info("api pause command received")
-        oven.state = 'PAUSED'
-
-    if bottle.request.json['cmd'] == 'resume':
-        log.info("api resume command received")
-        oven.state = 'RUNNING'
-
-    if bottle.request.json['cmd'] == 'stop':
-        log.info("api stop command received")
-        oven.abort_run()
-
-    if bottle.request.json['cmd'] == 'memo':
-        log.info("api memo command received")
-        memo = bottle.request.json['memo']
-        log.info("memo=%s" % (memo))
-
-    # get stats during a run
-    if bottle.request.json['cmd'] == 'stats':
-        log.info("api stats command received")
-        if hasattr(oven,'pid'):
-            if hasattr(oven.pid,'pidstats'):
-                return json.dumps(oven.pid.pidstats)
-
-    return { "success" : True }
+    bottle.response.content_type = 'application/json'
+    return API_SUCCESS
 
 def find_profile(wanted):
     '''
     given a wanted profile name, find it and return the parsed
     json profile object or None.
     '''
-    #load all profiles from disk
-    profiles = get_profiles()
-    json_profiles = json.loads(profiles)
-
-    # find the wanted profile
-    for profile in json_profiles:
-        if profile['name'] == wanted:
-            return profile
-    return None
+    # profiles are saved as <name>.json, so try that single file first
+    filepath = os.path.join(profile_path, "%s.json" % wanted)
+    if os.path.basename(filepath) == "%s.json" % wanted and os.path.isfile(filepath):
+        with open(filepath, 'rb') as f:
+            profile = json_loads(f.read())
+        if profile.get('name') == wanted:
+            return normalize_temp_units([profile])[0]
+
+    # refresh the profile cache from disk if anything changed
+    get_profiles()
+    return _profiles_cache["by_name"].get(wanted)
 
 @app.route('/picoreflow/:filename#.*#')
 def send_static(filename):
@@ -173,15 +222,16 @@ def handle_control():
     while True:
         try:
             message = wsock.receive()
+            if message is None:
+                break
             if message:
                 log.info("Received (control): %s" % message)
-                msgdict = json.loads(message)
+                msgdict = json_loads(message)
                 if msgdict.get("cmd") == "RUN":
                     log.info("RUN command received")
                     profile_obj = msgdict.get('profile')
                     if profile_obj:
-                        profile_json = json.dumps(profile_obj)
-                        profile = Profile(profile_json)
+                        profile = Profile(profile_obj)
                     oven.run_profile(profile)
                     ovenWatcher.record(profile)
                 elif msgdict.get("cmd") == "SIMULATE":
@@ -198,28 +248,40 @@ def handle_control():
                 elif msgdict.get("cmd") == "STOP":
                     log.info("Stop command received")
                     oven.abort_run()
-            time.sleep(1)
         except WebSocketError as e:
             log.error(e)
             break
     log.info("websocket (control) closed")
 
 
+STORAGE_PUT_OK = json_dumps({"cmd": "PUT", "resp": "OK"})
+
 @app.route('/storage')
 def handle_storage():
     wsock = get_websocket_from_request()
     log.info("websocket (storage) opened")
+    last_op = 0
     while True:
         try:
             message = wsock.receive()
             if not message:
                 break
-            log.debug("websocket (storage) received: %s" % message)
 
-            try:
-                msgdict = json.loads(message)
-            except:
-                msgdict = {}
+            # allow at most one storage operation per second per client,
+            # but don't delay one that arrives after a quiet period
+            wait = 1 - (time.monotonic() - last_op)
+            if wait > 0:
+                gevent.sleep(wait)
+            last_op = time.monotonic()
+            log.debug("websocket (storage) received: %s", message)
+
+            # plain commands like GET aren't json, skip the parser for them
+            msgdict = {}
+            if message[0] == "{":
+                try:
+                    msgdict = json_loads(message)
+                except ValueError:
+                    pass
 
             if message == "GET":
                 log.info("GET command received")
@@ -229,7 +291,7 @@ def handle_storage():
                 profile_obj = msgdict.get('profile')
                 if delete_profile(profile_obj):
                   msgdict["resp"] = "OK"
-                wsock.send(json.dumps(msgdict))
+                wsock.send(json_dumps(msgdict))
                 #wsock.send(get_profiles())
             elif msgdict.get("cmd") == "PUT":
                 log.info("PUT command received")
@@ -239,14 +301,18 @@ def handle_storage():
                 if profile_obj:
                     #del msgdict["cmd"]
                     if save_profile(profile_obj, force):
-                        msgdict["resp"] = "OK"
+                        # the client only looks at resp on success, so
+                        # don't echo the whole profile back
+                        reply = STORAGE_PUT_OK
                     else:
+                        # the client resends this message to force an
+                        # overwrite, so it needs the profile
                         msgdict["resp"] = "FAIL"
-                    log.debug("websocket (storage) sent: %s" % message)
+                        reply = json_dumps(msgdict)
+                    log.debug("websocket (storage) sent: %s", reply)
 
-                    wsock.send(json.dumps(msgdict))
+                    wsock.send(reply)
                     wsock.send(get_profiles())
-            time.sleep(1) 
         except WebSocketError:
             break
     log.info("websocket (storage) closed")
@@ -259,10 +325,11 @@ def handle_config():
     while True:
         try:
             message = wsock.receive()
+            if message is None:
+                break
             wsock.send(get_config())
         except WebSocketError:
             break
-        time.sleep(1)
     log.info("websocket (config) closed")
 
 
@@ -275,37 +342,74 @@ def handle_status():
     while True:
         try:
             message = wsock.receive()
+            if message is None:
+                break
             wsock.send("Your message was: %r" % message)
         except WebSocketError:
             break
-        time.sleep(1)
+    observer.close()
+    try:
+        ovenWatcher.observers.remove(observer)
+    except ValueError:
+        # already dropped by OvenWatcher after a failed send
+        pass
     log.info("websocket (status) closed")
 
 
-def get_profiles():
+# profiles are re-read from disk only when a file in profile_path changes.
+# sig is a sorted tuple of (filename, mtime, size) for every profile file.
+# by_name maps each profile name to its first parsed profile.
+_profiles_cache = {"sig": None, "json": None, "by_name": {}}
+
+def get_profiles_signature():
     try:
-        profile_files = os.listdir(profile_path)
-    except:
-        profile_files = []
-    profiles = []
-    for filename in profile_files:
-        with open(os.path.join(profile_path, filename), 'r') as f:
-            profiles.append(json.load(f))
-    profiles = normalize_temp_units(profiles)
-    return json.dumps(profiles)
+        with os.scandir(profile_path) as entries:
+            return tuple(sorted((e.name, e.stat().st_mtime_ns, e.stat().st_size)
+                for e in entries if e.name.endswith(".json")))
+    except OSError:
+        return ()
+
+def get_profiles():
+    sig = get_profiles_signature()
+    if sig == _profiles_cache["sig"]:
+        return _profiles_cache["json"]
+    raw_profiles = []
+    for (filename, mtime, size) in sig:
+        with open(os.path.join(profile_path, filename), 'rb') as f:
+            raw_profiles.append(f.read().strip())
+    profiles = normalize_temp_units([json_loads(raw) for raw in raw_profiles])
+    _profiles_cache["sig"] = sig
+    by_name = {}
+    for profile in profiles:
+        by_name.setdefault(profile.get('name'), profile)
+    _profiles_cache["by_name"] = by_name
+    if config.temp_scale == "f":
+        _profiles_cache["json"] = json_dumps(profiles)
+    else:
+        # nothing was converted, so the files on disk are already the
+        # json we would send. join them instead of re-serializing.
+        _profiles_cache["json"] = (b"[" + b",".join(raw_profiles) + b"]").decode()
+    return _profiles_cache["json"]
+
+def invalidate_profiles_cache():
+    _profiles_cache["sig"] = None
 
 
 def save_profile(profile, force=False):
     profile=add_temp_units(profile)
-    profile_json = json.dumps(profile)
+    profile_json = json_dumps(profile)
     filename = profile['name']+".json"
     filepath = os.path.join(profile_path, filename)
     if not force and os.path.exists(filepath):
         log.error("Could not write, %s already exists" % filepath)
         return False
-    with open(filepath, 'w+') as f:
+    # write a temp file and rename it over the profile, so a crash or
+    # power cut mid-write can't leave a truncated profile behind
+    tmppath = filepath + ".tmp"
+    with open(tmppath, 'w', encoding='utf-8') as f:
         f.write(profile_json)
-        f.close()
+    os.replace(tmppath, filepath)
+    invalidate_profiles_cache()
     log.info("Wrote %s" % filepath)
     return True
 
@@ -324,41 +428,38 @@ def add_temp_units(profile):
         return profile
 
 def convert_to_c(profile):
-    newdata=[]
-    for (secs,temp) in profile["data"]:
-        temp = (5/9)*(temp-32)
-        newdata.append((secs,temp))
-    profile["data"]=newdata
+    profile["data"]=[(secs,(5/9)*(temp-32)) for (secs,temp) in profile["data"]]
     return profile
 
 def convert_to_f(profile):
-    newdata=[]
-    for (secs,temp) in profile["data"]:
-        temp = ((9/5)*temp)+32
-        newdata.append((secs,temp))
-    profile["data"]=newdata
+    profile["data"]=[(secs,((9/5)*temp)+32) for (secs,temp) in profile["data"]]
     return profile
 
 def normalize_temp_units(profiles):
+    # profiles are stored in c, so only an f display needs any work
+    if config.temp_scale != "f":
+        return profiles
     normalized = []
     for profile in profiles:
-        if "temp_units" in profile:
-            if config.temp_scale == "f" and profile["temp_units"] == "c": 
-                profile = convert_to_f(profile)
-                profile["temp_units"] = "f"
+        if profile.get("temp_units") == "c":
+            profile = convert_to_f(profile)
+            profile["temp_units"] = "f"
         normalized.append(profile)
     return normalized
 
 def delete_profile(profile):
-    profile_json = json.dumps(profile)
+    profile_json = json_dumps(profile)
     filename = profile['name']+".json"
     filepath = os.path.join(profile_path, filename)
     os.remove(filepath)
+    invalidate_profiles_cache()
     log.info("Deleted %s" % filepath)
     return True
 
+# config is only read at start-up, so the serialized form never changes
+@functools.lru_cache(maxsize=1)
 def get_config():
-    return json.dumps({"temp_scale": config.temp_scale,
+    return json_dumps({"temp_scale": config.temp_scale,
         "time_scale_slope": config.time_scale_slope,
         "time_scale_profile": config.time_scale_profile,
         "kwh_rate": config.kwh_rate,
@@ -69,25 +69,28 @@ def logger(hostname, csvfile, noprofilestats, pidstats, stdout):
 
             continue
 
-        if msg.get('type') == 'backlog':
-            continue
-
-        if not noprofilestats:
-            msg['stamp'] = time.time()
-        if pidstats and 'pidstats' in msg:
-            for k, v in msg.get('pidstats', {}).items():
-                msg[f"pid_{k}"] = v
-
-        csv_out.writerow(msg)
-        out.flush()
-
-        if stdout:
-            for k in list(msg.keys()):
-                v = msg[k]
-                if isinstance(v, float):
-                    msg[k] = '{:5.3f}'.format(v)
-            csv_stdout.writerow(msg)
-            sys.stdout.flush()
+        # the server batches updates for a lagging client into one array frame
+        msgs = msg if isinstance(msg, list) else [msg]
+        for msg in msgs:
+            if msg.get('type') == 'backlog':
+                continue
+
+            if not noprofilestats:
+                msg['stamp'] = time.time()
+            if pidstats and 'pidstats' in msg:
+                for k, v in msg.get('pidstats', {}).items():
+                    msg[f"pid_{k}"] = v
+
+            csv_out.writerow(msg)
+            out.flush()
+
+            if stdout:
+                for k in list(msg.keys()):
+                    v = msg[k]
+                    if isinstance(v, float):
+                        msg[k] = '{:5.3f}'.format(v)
+                csv_stdout.writerow(msg)
+                sys.stdout.flush()
 
 
 if __name__ == "__main__":
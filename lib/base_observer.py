@@ -1,6 +1,13 @@
 class BaseObserver:
+    # observers that put json on the wire set this so OvenWatcher can
+    # serialize each update once and hand them the result via send_json()
+    sends_json = False
+
     def __init__(self, observer_type="generic"):
         self.observer_type = observer_type
 
     def send(self, data):
         raise NotImplementedError("Observer must implement .send(data)")
+
+    def send_json(self, payload):
+        raise NotImplementedError("Observer with sends_json must implement .send_json(payload)")
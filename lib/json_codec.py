@@ -0,0 +1,14 @@
+import json
+
+# orjson is optional and several times faster than the stdlib json module,
+# which is used as a fallback when orjson is not installed. json_dumps
+# returns str either way: websocket frames must stay text frames for the
+# browser.
+try:
+    import orjson
+    json_loads = orjson.loads
+    def json_dumps(obj):
+        return orjson.dumps(obj).decode()
+except ImportError:
+    json_loads = json.loads
+    json_dumps = json.dumps
@@ -487,8 +487,12 @@ class Oven(threading.Thread):
         return state
 
     def save_state(self):
-        with open(config.automatic_restart_state_file, 'w', encoding='utf-8') as f:
-            json.dump(self.get_state(), f, ensure_ascii=False, indent=4)
+        '''this runs every cycle, so write compactly and atomically: a
+        power cut mid-write must not corrupt the file used to restart'''
+        tmpfile = config.automatic_restart_state_file + ".tmp"
+        with open(tmpfile, 'w', encoding='utf-8') as f:
+            json.dump(self.get_state(), f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmpfile, config.automatic_restart_state_file)
 
     def state_file_is_old(self):
         '''returns True is state files is older than 15 mins default
@@ -532,8 +536,7 @@ class Oven(threading.Thread):
 
         log.info("automatically restarting profile = %s at minute = %d" % (profile_path,startat))
         with open(profile_path) as infile:
-            profile_json = json.dumps(json.load(infile))
-        profile = Profile(profile_json)
+            profile = Profile(json.load(infile))
         self.run_profile(profile, startat=startat, allow_seek=False)  # We don't want a seek on an auto restart.
         self.cost = d["cost"]
         time.sleep(1)
@@ -731,7 +734,8 @@ class RealOven(Oven):
 
 class Profile():
     def __init__(self, json_data):
-        obj = json.loads(json_data)
+        '''json_data is either a json string or an already parsed dict'''
+        obj = json.loads(json_data) if isinstance(json_data, str) else json_data
         self.name = obj["name"]
         self.data = sorted(obj["data"])
 
@@ -1,6 +1,7 @@
-import threading,logging,json,time,datetime
+import threading,logging,time,datetime
 from oven import Oven
 from lib.webSocket_observer import WebSocketObserver
+from lib.json_codec import json_dumps
 
 log = logging.getLogger(__name__)
 
@@ -68,21 +69,30 @@ class OvenWatcher(threading.Thread):
             'log': self.lastlog_subset(),
             #'started': self.started
         }
-        print(backlog)
-        backlog_json = json.dumps(backlog)
+        log.debug("sending backlog: %s", backlog)
         try:
-            print(backlog_json)
-            observer.send(backlog_json)
+            if getattr(observer,'sends_json',False):
+                observer.send_json(json_dumps(backlog))
+            else:
+                observer.send(backlog)
         except:
             log.error("Could not send backlog to new observer")
         
         self.observers.append(observer)
 
     def notify_all(self, message):
-        log.debug("sending to %d clients: %s"%(len(self.observers),message))
-        for obs in self.observers:
+        log.debug("sending to %d clients: %s", len(self.observers), message)
+        # serialized at most once per update, however many clients there are
+        payload = None
+        # iterate over a copy, failed observers are removed from the list
+        for obs in list(self.observers):
             try:
-                obs.send(message)
+                if getattr(obs, 'sends_json', False):
+                    if payload is None:
+                        payload = json_dumps(message)
+                    obs.send_json(payload)
+                else:
+                    obs.send(message)
             except Exception as e:
                 log.error(f"Could not write to observer ({getattr(obs, 'observer_type', 'unknown')}): {e}")
                 self.observers.remove(obs)
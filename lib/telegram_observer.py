@@ -3,9 +3,29 @@ import telegram
 import config
 from lib.base_observer import BaseObserver
 import time
+import queue
+import threading
+from collections import ChainMap
 
 log = logging.getLogger(__name__)
 
+MESSAGE_TEMPLATE = (
+    "🔥 Kiln Status Update 🔥\n"
+    "State: {state}\n"
+    "Profile: {profile}\n"
+    "Temp: {temperature:.1f}°C / Target: {target:.1f}°C\n"
+    "Runtime: {runtime}s\n"
+    "Error: {err:+.1f}°C"
+)
+
+# used for any field missing from the kiln data
+MESSAGE_DEFAULTS = {
+    "temperature": 0.0,
+    "target": 0.0,
+    "state": "IDLE",
+    "profile": "N/A",
+}
+
 class TelegramObserver(BaseObserver):
     def __init__(self):
         super().__init__(observer_type="telegram")
@@ -13,8 +33,12 @@ class TelegramObserver(BaseObserver):
         self.token = config.telegram_bot_token
         self.chat_id = config.telegram_chat_id
         self.interval = config.telegram_update_interval
+        self.send_when_idle = config.telegram_send_when_idle
         self.bot = None
-        self.last_sent = 0
+        self.last_sent = None
+        # messages waiting for the worker thread. small on purpose, these
+        # are status updates and a newer one will follow soon.
+        self.queue = queue.Queue(maxsize=4)
 
         if not self.enabled:
             log.info("[TelegramObserver] Disabled in config.")
@@ -26,48 +50,63 @@ class TelegramObserver(BaseObserver):
         except Exception as e:
             log.error(f"[TelegramObserver] Initialization failed: {e}")
             self.enabled = False
+            return
+
+        self.worker = threading.Thread(target=self.run_worker, daemon=True)
+        self.worker.start()
 
     def send(self, data):
         if not self.enabled or not self.bot:
             return
-        
+
+        # monotonic so wall clock changes (e.g. ntp sync at boot) can't
+        # stall or burst updates
+        now = time.monotonic()
+        if self.last_sent is not None and now - self.last_sent < self.interval:
+            return  # Throttle messages
+
         #to avoid backlog which is not in the correct format
         #TODO implement backlog for telegram bot.
         if not isinstance(data, dict):
-            log.debug(f"[TelegramObserver] Ignoring non-dict message: {data}")
+            log.debug("[TelegramObserver] Ignoring non-dict message: %s", data)
             return
     
         # Skip if state is IDLE and we're not supposed to send in that case
         state = data.get("state", "IDLE")
-        if state == "IDLE" and not config.telegram_send_when_idle:
+        if state == "IDLE" and not self.send_when_idle:
             log.debug("[TelegramObserver] Skipping message while kiln is IDLE.")
             return
 
-
-        now = time.time()
-        if now - self.last_sent < self.interval:
-            return  # Throttle messages
-
         try:
             message = self.format_message(data)
-            self.bot.send_message(chat_id=self.chat_id, text=message)
-            self.last_sent = now
         except Exception as e:
-            log.error(f"[TelegramObserver] Failed to send message: {e}")
+            log.error(f"[TelegramObserver] Failed to format message: {e}")
+            return
 
-    def format_message(self, data):
-        temp = data.get("temperature", 0.0)
-        target = data.get("target", 0.0)
-        state = data.get("state", "IDLE")
-        profile = data.get("profile", "N/A")
-        runtime = int(data.get("runtime", 0))
-        err = data.get("pidstats", {}).get("err", 0.0)
+        try:
+            self.queue.put_nowait(message)
+            self.last_sent = now
+        except queue.Full:
+            log.warning("[TelegramObserver] Send queue full, dropping update.")
 
-        return (
-            f"🔥 Kiln Status Update 🔥\n"
-            f"State: {state}\n"
-            f"Profile: {profile}\n"
-            f"Temp: {temp:.1f}°C / Target: {target:.1f}°C\n"
-            f"Runtime: {runtime}s\n"
-            f"Error: {err:+.1f}°C"
-        )
+    def run_worker(self):
+        '''
+        Sends queued messages. The https round trip to telegram runs here
+        so it never holds up the OvenWatcher loop or the other observers.
+        '''
+        while True:
+            message = self.queue.get()
+            try:
+                self.bot.send_message(chat_id=self.chat_id, text=message)
+            except Exception as e:
+                log.error(f"[TelegramObserver] Failed to send message: {e}")
+                # send() throttles from when a message was queued, so let
+                # the next update through instead of waiting a full interval
+                self.last_sent = None
+
+    def format_message(self, data):
+        fields = {
+            "runtime": int(data.get("runtime", 0)),
+            "err": data.get("pidstats", {}).get("err", 0.0),
+        }
+        return MESSAGE_TEMPLATE.format_map(ChainMap(fields, data, MESSAGE_DEFAULTS))
@@ -1,14 +1,106 @@
-import json
+import logging
+import socket
+import threading
+import time
+from collections import deque
+from geventwebsocket import WebSocketError
 from lib.base_observer import BaseObserver
+from lib.json_codec import json_dumps
+
+log = logging.getLogger(__name__)
 
 class WebSocketObserver(BaseObserver):
+    sends_json = True
+    # updates kept for a client whose writer is stuck, about a minute at
+    # the default sensor_time_wait. older ones are dropped first.
+    max_pending = 32
+    # a client with a full queue whose writer hasn't finished a send for
+    # this many seconds is treated as gone
+    slow_client_timeout = 60
+
     def __init__(self, wsock):
         super().__init__(observer_type="web")
         self.wsock = wsock
+        self.failed = False
+        self.last_payload = None
+        self.last_write = time.monotonic()
+        self.tune_socket()
+        # payloads waiting for the writer thread
+        self.pending = deque(maxlen=self.max_pending)
+        self.wakeup = threading.Event()
+        self.writer = threading.Thread(target=self.run_writer, daemon=True)
+        self.writer.start()
 
-    def send(self, data):
+    def tune_socket(self):
+        '''
+        Status frames are small. Without TCP_NODELAY, Nagle holds each one
+        back until the previous segment is acked, so turn it off and give
+        the kernel room to buffer a backlog.
+        '''
         try:
-            self.wsock.send(json.dumps(data))
-        except Exception as e:
-            import logging
-            logging.getLogger(__name__).error(f"[WebSocketObserver] send() failed: {e}")
+            handler = getattr(self.wsock, 'handler', None) or self.wsock.stream.handler
+            sock = handler.socket
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 65536)
+        except (AttributeError, OSError) as e:
+            log.debug("[WebSocketObserver] could not tune socket: %s", e)
+
+    def send(self, data):
+        self.send_json(json_dumps(data))
+
+    def send_json(self, payload):
+        # raising lets OvenWatcher drop this observer once the socket is gone
+        if self.failed:
+            raise WebSocketError("websocket writer stopped")
+        # an idle kiln often reports the exact same state every cycle
+        if payload == self.last_payload:
+            return
+        if (len(self.pending) == self.max_pending and
+                time.monotonic() - self.last_write > self.slow_client_timeout):
+            raise WebSocketError("websocket client too slow")
+        self.last_payload = payload
+        self.pending.append(payload)
+        self.wakeup.set()
+
+    def close(self):
+        '''
+        Stops the writer thread. Called when the client goes away, since
+        an idle kiln may never send anything that would fail.
+        '''
+        self.failed = True
+        self.pending.clear()
+        self.wakeup.set()
+
+    def run_writer(self):
+        '''
+        Sends queued payloads. Anything that queued up while the previous
+        frame was being written goes out together as one json array, so
+        a burst costs one frame instead of one per update.
+        '''
+        while True:
+            self.wakeup.wait()
+            self.wakeup.clear()
+            if self.failed:
+                return
+            payloads = []
+            # close() may empty the deque between a length check and
+            # popleft(), so pop until it reports empty
+            while True:
+                try:
+                    payloads.append(self.pending.popleft())
+                except IndexError:
+                    break
+            if not payloads:
+                continue
+            if len(payloads) == 1:
+                frame = payloads[0]
+            else:
+                frame = "[" + ",".join(payloads) + "]"
+            try:
+                self.wsock.send(frame)
+                self.last_write = time.monotonic()
+            except Exception as e:
+                log.error(f"[WebSocketObserver] send() failed: {e}")
+                self.failed = True
+                self.pending.clear()
+                return
@@ -501,9 +501,8 @@ $(document).ready(function()
           });
         };
 
-        ws_status.onmessage = function(e)
+        var updateStatus = function(x)
         {
-            x = JSON.parse(e.data);
             if (x.type == "backlog")
             {
                 if (x.profile)
@@ -590,6 +589,14 @@ $(document).ready(function()
             }
         };
 
+        ws_status.onmessage = function(e)
+        {
+            // updates that queued up on the server arrive as one array
+            var msg = JSON.parse(e.data);
+            if (!Array.isArray(msg)) { msg = [msg]; }
+            $.each(msg, function(i, x) { updateStatus(x); });
+        };
+
         // Config Socket /////////////////////////////////
 
         ws_config.onopen = function()
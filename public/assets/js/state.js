@@ -11,7 +11,13 @@ var ws_status = new WebSocket(host+"/status");
 var ws_config = new WebSocket(host+"/config");
 
 ws_status.onmessage = function(e) {
-  x = JSON.parse(e.data);
+  // updates that queued up on the server arrive as one array
+  var msg = JSON.parse(e.data);
+  if (!Array.isArray(msg)) { msg = [msg]; }
+  msg.forEach(update_status);
+  };
+
+function update_status(x) {
   if (x.pidstats) {
     x.pidstats["datetime"]=unix_to_yymmdd_hhmmss(x.pidstats.time);
     x.pidstats.err = x.pidstats.err*-1;